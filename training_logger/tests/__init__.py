@@ -1 +1,2 @@
-from .visualizer_test import *
\ No newline at end of file
+from .visualizer_test import *
+from .logger_test import *
\ No newline at end of file
@@ -0,0 +1,275 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from unittest.mock import patch
+
+from training_logger.training_logger import TrainingLogger
+
+class TrainingLoggerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.logger = TrainingLogger(os.path.join(self.tmpdir.name, 'log'))
+
+    def tearDown(self):
+        self.logger.close()
+        self.tmpdir.cleanup()
+
+    def test_prefix(self):
+        self.logger.add_to_prefix('train/')
+        self.assertEqual(self.logger._get_name('loss'), 'train/loss')
+
+        self.logger.remove_from_prefix('train/')
+        self.assertEqual(self.logger.prefix, '')
+        self.assertEqual(self.logger._get_name('loss'), 'loss')
+
+    def test_postfix(self):
+        self.logger.add_to_postfix('/epoch')
+        self.assertEqual(self.logger._get_name('loss'), 'loss/epoch')
+
+        self.logger.remove_from_postfix('/epoch')
+        self.assertEqual(self.logger.postfix, '')
+        self.assertEqual(self.logger._get_name('loss'), 'loss')
+
+    def test_remove_wrong_postfix(self):
+        self.logger.add_to_postfix('/epoch')
+        with self.assertRaises(ValueError):
+            self.logger.remove_from_postfix('/step')
+
+    def test_wrong_datatype(self):
+        self.logger.add_scalar('loss', 1.0)
+        with self.assertRaises(TypeError):
+            self.logger.add_text('loss', 'high')
+
+    def test_wrong_datatype_registers_nothing(self):
+        self.logger.add_text('note', 'x')
+        with self.assertRaises(TypeError):
+            self.logger.add_scalars(loss=1.0, note=2.0)
+        self.assertNotIn('loss', self.logger.metadata)
+
+    def test_invalid_image_registers_nothing(self):
+        with self.assertRaises(AttributeError):
+            self.logger.add_image('im', [[1, 2], [3, 4]])
+        self.assertNotIn('im', self.logger.metadata)
+
+    def test_parquet_cache_stale(self):
+        try:
+            import pyarrow
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+        path = self.logger.basename
+        self.logger.add_scalar('loss', 1.0)
+        self.logger.close()
+
+        TrainingLogger(path, True, parquet_cache=True).close()
+        self.logger = TrainingLogger(path, True)
+        self.logger.add_scalar('loss', 2.0)
+        self.logger.close()
+
+        self.logger = TrainingLogger(path, True, parquet_cache=True)
+        self.assertEqual(list(self.logger.data['loss']), [1.0, 2.0])
+
+    def test_parquet_cache_same_mtime(self):
+        try:
+            import pyarrow
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+        path = self.logger.basename
+        self.logger.add_scalar('loss', 1.0)
+        self.logger.close()
+        TrainingLogger(path, True, parquet_cache=True).close()
+
+        # An append within the same mtime tick, as on filesystems with coarse timestamps
+        csv = os.path.join(path, 'data.csv')
+        stat = os.stat(csv)
+        with open(csv, 'a') as f:
+            f.write('1,2.0\n')
+        os.utime(csv, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        self.logger = TrainingLogger(path, True, parquet_cache=True)
+        self.assertEqual(list(self.logger.data['loss']), [1.0, 2.0])
+
+    def test_save_freq_deprecated(self):
+        path = self.logger.basename
+        self.logger.close()
+
+        with self.assertWarns(DeprecationWarning):
+            self.logger = TrainingLogger(path, True, 50)
+        self.assertEqual(self.logger.save_interval, 30)
+        self.logger.save(True)
+
+    def test_manifest_lists_written_images(self):
+        self.logger.add_image('im', np.zeros((4, 4), dtype=np.uint8))
+        self.logger.save()
+        self.logger._write_q.join()
+
+        with open(os.path.join(self.logger.basename, 'images.jsonl')) as f:
+            paths = [json.loads(line)['path'] for line in f]
+        self.assertEqual(len(paths), 1)
+        self.assertTrue(os.path.exists(paths[0]))
+
+class TrainingLoggerRoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'log')
+        self.logger = TrainingLogger(self.path)
+
+    def tearDown(self):
+        self.logger.close()
+        self.tmpdir.cleanup()
+
+    def reopen(self):
+        self.logger.close()
+        self.logger = TrainingLogger(self.path, True)
+        return self.logger
+
+    def test_append_after_reopen(self):
+        self.logger.add_scalar('loss', 1.0)
+        self.reopen().add_scalar('loss', 2.0)
+
+        logger = self.reopen()
+
+        self.assertEqual(list(logger.data.index), [0, 1])
+        self.assertEqual(list(logger.data['loss']), [1.0, 2.0])
+
+    def test_update_existing_iteration(self):
+        self.logger.add_scalar('loss', 1.0, iteration=0)
+        self.logger.add_scalar('loss', 2.0, iteration=1)
+        self.logger.flush()
+        self.logger.add_scalar('loss', 3.0, iteration=0)
+        self.logger.add_scalar('acc', 0.5, iteration=1)
+
+        logger = self.reopen()
+
+        self.assertEqual(list(logger.data.index), [0, 1])
+        self.assertEqual(list(logger.data['loss']), [3.0, 2.0])
+        self.assertTrue(np.isnan(logger.data['acc'][0]))
+        self.assertEqual(logger.data['acc'][1], 0.5)
+
+    def test_scalars_and_text(self):
+        for i in range(3):
+            self.logger.add_scalars(pre='train/', loss=1.0 / (i + 1), acc=i / 10)
+        self.logger.add_text('note', 'done', iteration=2)
+
+        logger = self.reopen()
+
+        self.assertEqual(logger.metadata, {'train/loss': 'scalar', 'train/acc': 'scalar', 'note': 'text'})
+        self.assertEqual(list(logger.data.index), [0, 1, 2])
+        self.assertEqual(list(logger.data['train/loss']), [1.0, 0.5, 1.0 / 3])
+        self.assertEqual(logger.data['note'][2], 'done')
+
+    def test_flush_writes_csv(self):
+        self.logger.add_scalar('loss', 1.0)
+        self.logger.flush()
+        self.logger.add_scalar('loss', 2.0)
+        self.logger.flush()
+
+        data = pd.read_csv(os.path.join(self.path, 'data.csv'), index_col=0)
+        self.assertEqual(list(data['loss']), [1.0, 2.0])
+
+    def test_image_only(self):
+        self.logger.add_image('im', np.zeros((4, 4), dtype=np.uint8))
+        self.logger.add_image('im', np.ones((4, 4), dtype=np.float32) / 2)
+
+        logger = self.reopen()
+
+        self.assertEqual(logger.metadata, {'im': 'img'})
+        self.assertEqual(list(logger.images['im']), [0, 1])
+        self.assertTrue(all(os.path.exists(path) for path in logger.images['im'].values()))
+        self.assertEqual(len(logger.data.columns), 0)
+
+    def test_legacy_metadata(self):
+        self.logger.close()
+        legacy = os.path.join(self.tmpdir.name, 'legacy')
+        os.makedirs(legacy)
+        with open(os.path.join(legacy, 'data.csv'), 'w') as f:
+            f.write(',loss,note\n0,1.0,a\n1,0.5,b\n')
+        with open(os.path.join(legacy, 'data.meta'), 'w') as f:
+            f.write(str({'loss': 'scalar', 'note': 'text'}))
+
+        self.path = legacy
+        self.logger = TrainingLogger(legacy, True)
+        self.logger.add_scalar('acc', 0.1)
+
+        logger = self.reopen()
+
+        self.assertEqual(logger.metadata, {'loss': 'scalar', 'note': 'text', 'acc': 'scalar'})
+        self.assertEqual(list(logger.data['loss'].dropna()), [1.0, 0.5])
+        self.assertEqual(logger.data['acc'][2], 0.1)
+
+    def test_read_without_pyarrow(self):
+        self.logger.add_scalar('loss', 1.0)
+        self.logger.add_text('note', 'a')
+        self.logger.close()
+        read_csv = pd.read_csv
+
+        def read_csv_no_pyarrow(*args, engine=None, **kwargs):
+            if engine == 'pyarrow':
+                raise ImportError('pyarrow')
+            return read_csv(*args, **kwargs)
+
+        with patch('training_logger.training_logger.pd.read_csv', read_csv_no_pyarrow):
+            self.logger = TrainingLogger(self.path, True)
+
+        self.assertEqual(list(self.logger.data.columns), ['loss', 'note'])
+        self.assertIsNone(self.logger.data.index.name)
+
+    def test_next_iter_after_reopen(self):
+        self.logger.add_scalar('loss', 1.0)
+        self.logger.add_scalar('loss', 2.0, iteration=4)
+        self.logger.add_image('im', np.zeros((4, 4), dtype=np.uint8), iteration=6)
+
+        logger = self.reopen()
+
+        self.assertEqual(logger._next_iter, 7)
+        logger.add_scalar('loss', 3.0)
+        self.assertEqual(logger._pending_rows[-1]['__iter__'], 7)
+
+    def test_failed_image(self):
+        self.logger.add_scalar('loss', 1.0)
+        self.logger.add_image('im', np.zeros((4, 4), dtype=np.float64))
+        with self.assertRaises(OSError):
+            self.logger.close()
+
+        logger = self.reopen()
+
+        self.assertEqual(logger.metadata, {'loss': 'scalar', 'im': 'img'})
+        self.assertNotIn('im', logger.images)
+        self.assertEqual(list(logger.data['loss']), [1.0])
+
+    def test_failed_write_keeps_metadata(self):
+        rewrite_csv = self.logger.rewrite_csv
+        self.logger.add_scalar('loss', 1.0)
+        with patch.object(self.logger, 'rewrite_csv', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self.logger.flush()
+        self.logger.rewrite_csv = rewrite_csv
+        self.logger.add_scalar('acc', 0.5)
+
+        logger = self.reopen()
+
+        self.assertEqual(logger.metadata, {'loss': 'scalar', 'acc': 'scalar'})
+        self.assertEqual(list(logger.data['loss'].dropna()), [1.0])
+
+    def test_batches_queued_under_lock(self):
+        put = self.logger._write_q.put
+        locked = []
+
+        def checked_put(batch):
+            locked.append(self.logger._lock.locked())
+            put(batch)
+
+        self.logger.add_scalar('loss', 1.0)
+        with patch.object(self.logger._write_q, 'put', checked_put):
+            self.logger.save()
+            self.logger.add_scalar('loss', 2.0)
+            self.logger.save()
+        self.logger.flush()
+
+        self.assertEqual(locked, [True, True])
@@ -1,13 +1,32 @@
 import unittest
 import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
 
-from unittest.mock import patch
-from training_logger.visualizers import LogVisualizer
+from unittest.mock import MagicMock, patch
+from training_logger.visualizers import (LogVisualizer, MultiLogVisualizer, _finalize_axes, _gauss_smooth_1d,
+                                        _gauss_smooth_loop, _lttb_indices, _optional_import, _plot_batch)
+
+def reference_smooth(inp, window_size, sigma):
+    half = window_size // 2
+    weights = np.exp(-0.5 * (np.arange(-half, half + 1) / sigma) ** 2)
+    weights /= weights.sum()
+    return [
+        sum(w * inp[min(max(i + j, 0), inp.shape[0] - 1)] for j, w in zip(range(-half, half + 1), weights))
+        for i in range(inp.shape[0])
+    ]
 
 class MockLogVisualizer(LogVisualizer):
     def __init__(self):
         self.logger = None
         self.prefix = ''
+        self._smooth_cache = {}
+        self._series_cache = {}
+
+class MockMultiLogVisualizer(MultiLogVisualizer):
+    def __init__(self):
+        self.visualizers = []
+        self._cols = None
 
 class LogVisualizerTest(unittest.TestCase):
 
@@ -22,3 +41,216 @@ class LogVisualizerTest(unittest.TestCase):
 
         self.assertEqual(inp.shape[0], out.shape[0], "Input and output shapes are different")
 
+    def test_smoothing_even_window(self):
+        inp = np.arange(10, dtype=np.float64)
+
+        lv = MockLogVisualizer()
+
+        out = lv.smooth_data(inp, 4, 2)
+
+        self.assertEqual(inp.shape[0], out.shape[0], "Input and output shapes are different")
+
+    def test_smoothing_constant(self):
+        inp = np.full(20, 3.0)
+
+        lv = MockLogVisualizer()
+
+        out = lv.smooth_data(inp, 5, 2)
+
+        np.testing.assert_allclose(out, inp, err_msg="Smoothing changed a constant signal")
+
+    def test_smoothing_matches_reference(self):
+        rng = np.random.default_rng(0)
+        inp = rng.normal(size=50)
+
+        lv = MockLogVisualizer()
+
+        out = lv.smooth_data(inp, 5, 2)
+
+        np.testing.assert_allclose(out, reference_smooth(inp, 5, 2), err_msg="Smoothed values differ from the reference")
+
+    def test_smoothing_fft_matches_reference(self):
+        if _optional_import('scipy.signal', 'oaconvolve') is None:
+            self.skipTest('scipy is not installed')
+        rng = np.random.default_rng(0)
+        inp = rng.normal(size=300)
+        window_size = LogVisualizer.FFT_MIN_WINDOW
+
+        lv = MockLogVisualizer()
+
+        out = lv.smooth_data(inp, window_size, 16)
+
+        np.testing.assert_allclose(out, reference_smooth(inp, window_size, 16), err_msg="Smoothed values differ from the reference")
+
+    def test_smoothing_loop_matches_reference(self):
+        rng = np.random.default_rng(0)
+        inp = rng.normal(size=300)
+        kernels = [_gauss_smooth_loop]
+        if _gauss_smooth_1d() is not None:
+            kernels.append(_gauss_smooth_1d())
+
+        for kernel in kernels:
+            for window_size, sigma in ((5, 2), (LogVisualizer.FFT_MIN_WINDOW, 16)):
+                out = kernel(inp, LogVisualizer._gaussian_window(window_size, sigma))
+
+                np.testing.assert_allclose(out, reference_smooth(inp, window_size, sigma),
+                                           err_msg="Smoothed values differ from the reference")
+
+    def test_smoothing_numpy_matches_reference(self):
+        rng = np.random.default_rng(0)
+        inp = rng.normal(size=300)
+
+        with patch('training_logger.visualizers._optional_import', return_value=None), \
+                patch('training_logger.visualizers._gauss_smooth_1d', return_value=None):
+            for window_size, sigma in ((5, 2), (LogVisualizer.FFT_MIN_WINDOW, 16)):
+                out = MockLogVisualizer().smooth_data(inp, window_size, sigma)
+
+                np.testing.assert_allclose(out, reference_smooth(inp, window_size, sigma),
+                                           err_msg="Smoothed values differ from the reference")
+
+    def test_smoothing_cache(self):
+        inp = np.arange(10, dtype=np.float64)
+
+        lv = MockLogVisualizer()
+
+        first = lv._smooth_cached(inp, 3, 1)
+        self.assertIs(first, lv._smooth_cached(inp.copy(), 3, 1), "Smoothed data was not reused")
+        self.assertIsNot(first, lv._smooth_cached(inp, 5, 1), "Smoothed data was reused for another window")
+
+    def test_smoothing_writable(self):
+        inp = np.arange(10, dtype=np.float64)
+
+        lv = MockLogVisualizer()
+
+        out = lv.smooth_data(inp, 3, 1)
+        out[0] = -1
+        self.assertNotEqual(lv.smooth_data(inp, 3, 1)[0], -1, "Cached smoothed data was modified")
+
+    def test_matching_single_expression(self):
+        lv = MockLogVisualizer()
+
+        with patch.object(lv, 'get_cols', return_value=['train/loss', 'train/acc', 'val/loss']), \
+                patch.object(lv, 'show_scalars') as show_scalars:
+            lv.show_matching_scalars('train/.*')
+
+        self.assertEqual(show_scalars.call_args[0][0], ['train/loss', 'train/acc'])
+
+    def test_xy_fractional_iterations(self):
+        lv = MockLogVisualizer()
+        lv.logger = MagicMock(data=pd.DataFrame({'loss': [1.0, 2.0, 3.0]}, index=[0.5, 1.5, 2.5]))
+
+        x, _ = lv._get_xy('loss')
+
+        np.testing.assert_array_equal(x, [0.5, 1.5, 2.5])
+
+    def test_xy_large_offset_keeps_precision(self):
+        lv = MockLogVisualizer()
+        counter = np.arange(20_000_000, 20_000_010, dtype=np.float64)
+        lv.logger = MagicMock(data=pd.DataFrame({'samples': counter, 'loss': np.linspace(1, 0, 10)}))
+
+        _, samples = lv._get_xy('samples')
+        _, loss = lv._get_xy('loss')
+
+        np.testing.assert_array_equal(samples, counter)
+        self.assertEqual(loss.dtype, np.float32)
+
+    def test_finalize_axes_legend_once(self):
+        axes = MagicMock()
+        axes._tl_needs_legend = True
+
+        _finalize_axes(axes)
+        _finalize_axes(axes)
+
+        axes.legend.assert_called_once_with()
+
+class PlotBatchTest(unittest.TestCase):
+
+    def tearDown(self):
+        plt.close('all')
+
+    def test_single_collection(self):
+        series = [(np.arange(3), np.arange(3.0), 'a'), (np.arange(3), np.ones(3), 'b')]
+
+        axes = _plot_batch(series, linewidth=2)
+
+        self.assertEqual(len(axes.collections), 1)
+
+    def test_line_only_kwargs(self):
+        series = [(np.arange(3), np.arange(3.0), 'a'), (np.arange(3), np.ones(3), 'b')]
+
+        axes = _plot_batch(series, marker='o')
+
+        self.assertEqual(len(axes.collections), 0)
+        self.assertEqual([line.get_marker() for line in axes.lines], ['o', 'o'])
+
+class MultiLogVisualizerTest(unittest.TestCase):
+
+    def test_matching_overlapping_expressions(self):
+        mv = MockMultiLogVisualizer()
+
+        with patch.object(mv, 'get_cols', return_value=['train/loss', 'train/acc', 'val/loss']), \
+                patch.object(mv, 'show_scalars') as show_scalars:
+            mv.show_matching_scalars(['train/.*', '.*/loss'])
+
+        self.assertEqual(show_scalars.call_args[0][0], ['train/loss', 'train/acc', 'val/loss'])
+
+    def test_matching_inline_flags(self):
+        mv = MockMultiLogVisualizer()
+
+        with patch.object(mv, 'get_cols', return_value=['Loss', 'acc', 'lr']), \
+                patch.object(mv, 'show_scalars') as show_scalars:
+            mv.show_matching_scalars(['(?i)loss', 'acc'])
+
+        self.assertEqual(show_scalars.call_args[0][0], ['Loss', 'acc'])
+
+    def test_cols_ordered(self):
+        mv = MockMultiLogVisualizer()
+        mv.visualizers = [MagicMock(**{'get_cols.return_value': ['b', 'a']}),
+                          MagicMock(**{'get_cols.return_value': ['c', 'a']})]
+
+        self.assertEqual(mv.get_cols(), ['b', 'a', 'c'])
+
+    def test_all_scalars_union(self):
+        mv = MockMultiLogVisualizer()
+        first, second = MagicMock(_scalar_cols=['loss', 'acc']), MagicMock(_scalar_cols=['loss', 'lr'])
+        mv.visualizers = [first, second]
+
+        with patch('training_logger.visualizers._finalize_axes'), patch('training_logger.visualizers.plt'):
+            mv.show_all_scalars()
+
+        self.assertEqual([c[0][0] for c in first._draw_graph.call_args_list], ['loss', 'acc'])
+        self.assertEqual([c[0][0] for c in second._draw_graph.call_args_list], ['loss', 'lr'])
+
+class LTTBTest(unittest.TestCase):
+
+    def test_downsampling(self):
+        x = np.arange(1000)
+        y = np.sin(x / 50)
+
+        idx = _lttb_indices(x, y, 100)
+
+        self.assertEqual(idx.shape[0], 100, "Wrong number of points selected")
+        self.assertEqual(idx[0], 0, "First point not selected")
+        self.assertEqual(idx[-1], 999, "Last point not selected")
+        self.assertTrue(np.all(np.diff(idx) > 0), "Selected points are not sorted")
+
+    def test_short_series(self):
+        x = np.arange(10)
+
+        idx = _lttb_indices(x, x, 100)
+
+        np.testing.assert_array_equal(idx, x)
+
+    def test_numpy_fallback_matches_tsdownsample(self):
+        try:
+            from tsdownsample import LTTBDownsampler
+        except ImportError:
+            self.skipTest('tsdownsample is not installed')
+        rng = np.random.default_rng(0)
+        x = np.arange(5000)
+        y = np.cumsum(rng.normal(size=5000))
+
+        with patch('training_logger.visualizers._optional_import', return_value=None):
+            idx = _lttb_indices(x, y, 200)
+
+        np.testing.assert_array_equal(idx, LTTBDownsampler().downsample(x, y, n_out=200))
@@ -3,22 +3,47 @@ import pandas as pd
 import numpy as np
 import os, sys, shutil
 import json
+import ast
+import atexit
+import queue
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor, wait
 from PIL import Image
 
 
+#: Key of the Parquet cache metadata that records which state of data.csv the cache was made from
+_CACHE_STAMP_KEY = b"training_logger.csv_stamp"
+
+
+def _encode_and_save(value, path, compress_level):
+    Image.fromarray(value).save(path, format="PNG", compress_level=compress_level)
+
+
 class TrainingLogger:
     """
     Class for logging the training of neural networks.
 
     The class is a simple wrapper around a pandas dataframe and a json-file.
     Data is saved in the dataframe, and saved as a CSV-file to disk.
-    Metadata is saved in the json-file.
-    Images are saved in the root folder
+    Metadata is saved in the json-file, and new columns are appended to a JSON-lines log of metadata changes.
+    Images are saved in the root folder, and listed in a JSON-lines manifest.
+    New values are buffered, and only merged into the dataframe when the log is saved.
+    Saving is done by a background writer thread, started when the first value is added.
     """
 
     DATATYPES = set({"scalar", "img", "text"})
 
-    def __init__(self, basename, overwrite=False, save_freq=50):
+    def __init__(
+        self,
+        basename,
+        overwrite=False,
+        save_freq=None,
+        *,
+        save_interval=30,
+        compress_level=1,
+        parquet_cache=False,
+    ):
         """
         Create a new logger, which logs to :code:`basename`.
 
@@ -31,11 +56,25 @@ class TrainingLogger:
 
         :param basename: The directory to save logs, metadata, and images to.
         :param overwrite: If :code:`True`, no check is made to confirm that you wish to work with existing logs.
-        :param save_freq: The number of changes that must be made before data is saved to file.
+        :param save_freq: Deprecated and ignored. Data is saved every :code:`save_interval` seconds instead.
+        :param save_interval: The number of seconds between each time new data is saved to file.
+        :param compress_level: The zlib compression level (0-9) used when saving images as PNG.
+                    Low levels encode much faster, at the cost of somewhat larger files.
+        :param parquet_cache: If :code:`True`, existing data is read from a Parquet copy of the csv at
+                    :nocode:`<basename>/data.parquet` when it was made from the current csv, and the copy is
+                    written after reading the csv otherwise. This makes repeated loading of large logs
+                    much faster, and requires :mod:`pyarrow`.
         """
+        if save_freq is not None:
+            warnings.warn(
+                "save_freq is deprecated and ignored, use save_interval instead",
+                DeprecationWarning,
+                stacklevel=2,
+            )
         self.basename = basename
+        self.parquet_cache = parquet_cache
         try:
-            self.data = pd.read_csv(os.path.join(basename, "data.csv"), index_col=0)
+            self.data = self._read_data()
             if not overwrite:
                 q = input(
                     f"The directory {basename} already exists. Continue (this may overwrite old data)? [y/N] "
@@ -43,17 +82,16 @@ class TrainingLogger:
                 if q not in ("y", "yes", "j", "ja"):
                     print("Exiting due to existing file")
                     sys.exit(-1)
-            with open(os.path.join(basename, "data.meta"), "r") as f:
-                json_str = f.read().replace("'", '"')
-                self.metadata = dict(json.loads(json_str))
+            self.metadata = self._load_metadata()
 
-            assert set(self.metadata.keys()) == set(
-                self.data.columns
+            self.images = self._load_images()
+            columns = set(self.data.columns).union(self.images)
+            # Image columns have no manifest entries if none of their images could be written
+            assert columns <= self.metadata.keys() and all(
+                self.metadata[name] == "img" for name in self.metadata.keys() - columns
             ), "Loaded data and metadata does not match"
-            for v in self.metadata.values():
-                assert (
-                    v in TrainingLogger.DATATYPES
-                ), f"Unknown datatype in metadata: {v}"
+            unknown = set(self.metadata.values()) - TrainingLogger.DATATYPES
+            assert not unknown, f"Unknown datatype in metadata: {unknown}"
         except FileNotFoundError:
             try:
                 os.makedirs(basename)
@@ -70,38 +108,256 @@ class TrainingLogger:
                     sys.exit(-1)
             self.data = pd.DataFrame()
             self.metadata = {}
-        self.meta_changed = False
-        self.save_freq = save_freq
-        self.save_calls = 0
+            self.images = {}
+        # A new log gets a data.csv on the first save, even if no rows are added
+        self._needs_rewrite = len(self.data.columns) == 0
+        self._new_meta = {}
+        self.save_interval = save_interval
+        self.compress_level = compress_level
         self.prefix = ""
         self.postfix = ""
+        self._pending_rows = []
+        self._pending_images = []
+        self._next_iter = self._first_free_iteration()
+        self._rows_persisted = len(self.data)
+        self._img_pool = ThreadPoolExecutor(max_workers=2)
+        self._img_futures = []
+        self._known_dirs = set()
+        self._lock = threading.Lock()
+        self._write_q = queue.Queue()
+        self._writer = None
+        self._write_error = None
 
     def flush(self):
         """
-        Force write all new data to file.
+        Force write all new data to file, and wait for pending images to be written.
         """
-        self.save(True)
+        self.save()
+        self._write_q.join()
+        if self._write_error is not None:
+            error, self._write_error = self._write_error, None
+            raise error
+        futures, self._img_futures = self._img_futures, []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        """
+        Write all remaining data to file, and stop the background writer.
+        """
+        self.flush()
+        if self._writer is not None:
+            self._write_q.put(None)
+            self._writer.join()
+            self._writer = None
+            atexit.unregister(self.close)
+        self._img_pool.shutdown()
+
+    def _start_writer(self):
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _writer_loop(self):
+        while True:
+            try:
+                batch = self._write_q.get(timeout=self.save_interval)
+            except queue.Empty:
+                self.save()
+                continue
+            try:
+                if batch is None:
+                    break
+                self._write(*batch)
+            except Exception as e:
+                self._write_error = e
+            finally:
+                self._write_q.task_done()
+
+    def _append_row(self, row):
+        if self._writer is None:
+            self._start_writer()
+        self._pending_rows.append(row)
+
+    def _append_image(self, name, iteration, path, future):
+        if self._writer is None:
+            self._start_writer()
+        self.images.setdefault(name, {})[iteration] = path
+        self._pending_images.append(
+            ({"iter": iteration, "name": name, "path": path}, future)
+        )
+
+    def _read_data(self):
+        path = os.path.join(self.basename, "data.csv")
+        cache = os.path.join(self.basename, "data.parquet")
+        # Taken before reading, so rows appended while the csv is read make the cache stale.
+        # The size is part of the stamp, as appends within one mtime tick of coarse
+        # filesystems do not change the mtime.
+        stat = os.stat(path)
+        csv_stamp = json.dumps([stat.st_mtime_ns, stat.st_size]).encode()
+        if self.parquet_cache:
+            try:
+                import pyarrow.parquet as pq
+
+                cache_meta = pq.read_schema(cache).metadata or {}
+                if cache_meta.get(_CACHE_STAMP_KEY) == csv_stamp:
+                    return pd.read_parquet(cache, engine="pyarrow", memory_map=True)
+            except (OSError, ImportError, ValueError):
+                pass
+        try:
+            data = pd.read_csv(path, index_col=0, engine="pyarrow")
+        except ImportError:
+            data = pd.read_csv(path, index_col=0)
+        # The pyarrow engine names the index after the empty header cell
+        data.index.name = None
+        if self.parquet_cache:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                # The cache is stamped with the mtime and size of the csv it was read from
+                table = pa.Table.from_pandas(data)
+                table = table.replace_schema_metadata(
+                    {**(table.schema.metadata or {}), _CACHE_STAMP_KEY: csv_stamp}
+                )
+                pq.write_table(table, cache)
+            except (OSError, ImportError, TypeError, ValueError):
+                # The cache is only an optimization, the data is still read from the csv
+                pass
+        return data
+
+    def _load_metadata(self):
+        metadata = {}
+        try:
+            with open(os.path.join(self.basename, "data.meta"), "r") as f:
+                meta_str = f.read()
+            try:
+                metadata.update(json.loads(meta_str))
+            except json.JSONDecodeError:
+                # Logs written by older versions store the metadata as a python dict literal
+                metadata.update(ast.literal_eval(meta_str))
+        except FileNotFoundError:
+            pass
+        try:
+            with open(os.path.join(self.basename, "data.meta.jsonl"), "r") as f:
+                for line in f:
+                    metadata.update(json.loads(line))
+        except FileNotFoundError:
+            pass
+        return metadata
+
+    def _load_images(self):
+        images = {}
+        for name, datatype in self.metadata.items():
+            if datatype == "img" and name in self.data.columns:
+                # Logs written by older versions store image paths in the dataframe
+                images[name] = self.data[name].dropna().to_dict()
+        try:
+            with open(os.path.join(self.basename, "images.jsonl"), "r") as f:
+                for line in f:
+                    record = json.loads(line)
+                    images.setdefault(record["name"], {})[record["iter"]] = record[
+                        "path"
+                    ]
+        except FileNotFoundError:
+            pass
+        return images
 
     def save(self, force=False):
         """
         Save the content of the logger.
 
-        The method always saves the dataframe to a csv at :nocode:`<basename>/data.csv`,
-        but only saves the metadata to :nocode:`<basename>/data.meta` if the metadata
-        has changed (i.e. if a new column has been added).
+        The data added since the last save is handed over to the background writer, which
+        merges it into the dataframe and writes it to file. Use :meth:`flush` to wait for the write.
+        If the writer is not running, the data is written directly.
+
+        The writer appends rows added since the last save to the csv at :nocode:`<basename>/data.csv`.
+        The whole file is only rewritten if a new column has been added or an already saved row
+        has changed, see :meth:`rewrite_csv`.
+        Images added since the last save are appended to :nocode:`<basename>/images.jsonl` once they are written.
+        Columns added since the last save are appended to :nocode:`<basename>/data.meta.jsonl`.
+
+        :param force: Ignored, kept for compatibility. Every call saves all new data.
         """
-        self.save_calls += 1
-        if force or self.save_calls >= self.save_freq:
-            self.data.to_csv(os.path.join(self.basename, "data.csv"))
-            if self.meta_changed:
-                with open(os.path.join(self.basename, "data.meta"), "w") as f:
-                    f.write(str(self.metadata))
-                self.meta_changed = False
-            self.save_calls = 0
+        with self._lock:
+            rows, self._pending_rows = self._pending_rows, []
+            images, self._pending_images = self._pending_images, []
+            metadata, self._new_meta = self._new_meta, {}
+            writer = self._writer
+            if writer is not None:
+                # Queued under the lock, so batches from the writer's own periodic saves
+                # cannot overtake older batches
+                self._write_q.put((rows, images, metadata))
+        if writer is None:
+            self._write(rows, images, metadata)
+
+    def _write(self, rows, images, metadata):
+        try:
+            self._write_batch(rows, images, metadata)
+        except Exception:
+            # Rows are already merged into the dataframe and are written by the next save, but
+            # new columns and images must be put back, or they are never recorded on disk
+            with self._lock:
+                self._new_meta = {**metadata, **self._new_meta}
+                self._pending_images = images + self._pending_images
+            raise
+
+    def _write_batch(self, rows, images, metadata):
+        # The batch was swapped out of the buffers in save, and the dataframe is only touched
+        # by the writer, so the merge needs no lock and never blocks adding new values
+        self._flush_pending(rows)
+        if self._needs_rewrite:
+            self.rewrite_csv()
+        elif len(self.data.index) > self._rows_persisted:
+            self.data.iloc[self._rows_persisted :].to_csv(
+                os.path.join(self.basename, "data.csv"), mode="a", header=False
+            )
+            self._rows_persisted = len(self.data.index)
+        if images:
+            # Images are only listed once they are on disk, so readers of the manifest never
+            # see a missing file. Failed images are not listed, and the error is raised by flush.
+            wait([future for _, future in images])
+            with open(os.path.join(self.basename, "images.jsonl"), "a") as f:
+                for record, future in images:
+                    if future.exception() is None:
+                        f.write(json.dumps(record, default=int) + "\n")
+        if metadata:
+            with open(os.path.join(self.basename, "data.meta.jsonl"), "a") as f:
+                for name, datatype in metadata.items():
+                    f.write(json.dumps({name: datatype}) + "\n")
+
+    def rewrite_csv(self):
+        """
+        Write the complete dataframe to :nocode:`<basename>/data.csv`, replacing the existing file.
+        """
+        self.data.to_csv(os.path.join(self.basename, "data.csv"))
+        self._rows_persisted = len(self.data.index)
+        self._needs_rewrite = False
+
+    @property
+    def prefix(self):
+        return self._prefix
+
+    @prefix.setter
+    def prefix(self, value):
+        self._prefix = value
+        self._name_cache = {}
+
+    @property
+    def postfix(self):
+        return self._postfix
+
+    @postfix.setter
+    def postfix(self, value):
+        self._postfix = value
+        self._name_cache = {}
 
     def _get_name(self, name):
-        name = self.prefix + name + self.postfix
-        return name
+        try:
+            return self._name_cache[name]
+        except KeyError:
+            full_name = self._name_cache[name] = self.prefix + name + self.postfix
+            return full_name
 
     def add_to_prefix(self, name: Text):
         self.prefix = self.prefix + name
@@ -118,38 +374,82 @@ class TrainingLogger:
         if not self.postfix.endswith(name):
             raise ValueError("Can only remove last part of postfix.")
         self.postfix = self.postfix[: -len(name)]
-        self.postfix = None
-
-    def __insert_scalar(self, name, value, iteration=None):
-        name = self._get_name(name)
 
-        if name not in self.data.columns:
-            self.data[name] = None
-            self.metadata[name] = "scalar"
-            self.meta_changed = True
+    def __check_datatype(self, names, datatype):
+        """
+        Check that none of the columns are registered with another datatype.
 
-        assert (
-            self.metadata[name] == "scalar"
-        ), f"Wrong datatype 'scalar' for column of type '{self.metadata[name]}'"
+        :returns: The names that are not registered yet.
+        """
+        new_names = []
+        for name in names:
+            registered = self.metadata.get(name)
+            if registered is None:
+                new_names.append(name)
+            elif registered != datatype:
+                raise TypeError(
+                    f"Wrong datatype '{datatype}' for column of type '{registered}'"
+                )
+        return new_names
+
+    def __register(self, names, datatype):
+        # All names are checked before any is registered, so a failing call leaves the metadata unchanged
+        for name in self.__check_datatype(names, datatype):
+            self.metadata[name] = self._new_meta[name] = datatype
+
+    def __insert(self, name, value, datatype, iteration=None):
+        name = self._get_name(name)
+        with self._lock:
+            self.__register((name,), datatype)
+            iteration = self._resolve_iteration(iteration)
+            self._append_row({"__iter__": iteration, name: value})
 
-        if iteration is None:
-            iteration = len(self.data.index)
-        self.data.loc[iteration, name] = value
+    def __insert_scalar(self, name, value, iteration=None):
+        self.__insert(name, value, "scalar", iteration)
 
     def __insert_text(self, name, value, iteration=None):
-        name = self._get_name(name)
-        if name not in self.data.columns:
-            self.data[name] = None
-            self.metadata[name] = "text"
-            self.meta_changed = True
+        self.__insert(name, value, "text", iteration)
 
-        assert (
-            self.metadata[name] == "text"
-        ), f"Wrong datatype 'text' for column of type '{self.metadata[name]}'"
+    def _first_free_iteration(self):
+        iterations = [its.keys() for its in self.images.values() if its]
+        if len(self.data.index):
+            iterations.append(self.data.index)
+        if not iterations:
+            return 0
+        return int(max(max(its) for its in iterations)) + 1
 
+    def _resolve_iteration(self, iteration):
         if iteration is None:
-            iteration = len(self.data.index)
-        self.data.loc[iteration, name] = value
+            iteration = self._next_iter
+        if iteration >= self._next_iter:
+            self._next_iter = iteration + 1
+        return iteration
+
+    def _flush_pending(self, rows):
+        """
+        Merge a batch of buffered rows into the dataframe.
+
+        Rows logged to the same iteration are combined, and rows for iterations
+        that already exist in the dataframe update the existing row.
+        """
+        if not rows:
+            return
+        rows = pd.DataFrame(rows, dtype=object)
+        rows.index = pd.Index(rows.pop("__iter__").tolist(), name=self.data.index.name)
+        rows = rows.groupby(level=0, sort=False).last()
+        for name in rows.columns:
+            dtype = "float64" if self.metadata[name] == "scalar" else "string"
+            try:
+                rows[name] = rows[name].astype(dtype)
+            except (TypeError, ValueError):
+                # Scalars that are not numbers are kept as objects
+                pass
+        existing = rows.index.isin(self.data.index)
+        if existing.any() or not rows.columns.isin(self.data.columns).all():
+            self._needs_rewrite = True
+        self.data = pd.concat([self.data, rows[~existing]])
+        if existing.any():
+            self.data.update(rows[existing])
 
     def add_scalar(self, name, value, iteration=None):
         """
@@ -158,16 +458,15 @@ class TrainingLogger:
         If the given scalar name does not exist yet, a new
         column is added to the dataframe and metadata.
 
-        The method saves the data to file after adding.
+        The data is written to file by the next periodic save.
 
         :param name: Name of the value, used to group and display the data.
         :param value: Scalar value to add. Note that this should be a number, not a Tensor or Array,
                     for it to work properly with the visualization. However, no check is made against
                     this, meaning you are free to save whatever you wish.
-        :param iteration: Iteration to save this image to. Used for displaying the data. If None, :code:`iteration = len(self.data.index)`
+        :param iteration: Iteration to save this image to. Used for displaying the data. If None, the iteration after the highest one logged so far is used.
         """
         self.__insert_scalar(name, value, iteration)
-        self.save()
 
     def add_text(self, name, value, iteration=None):
         """
@@ -176,16 +475,15 @@ class TrainingLogger:
         If the given text name does not exist yet, a new
         column is added to the dataframe and metadata.
 
-        The method saves the data to file after adding.
+        The data is written to file by the next periodic save.
 
         :param name: Name of the value, used to group and display the data.
         :param value: Text value to add. No check is made against the type of this
                     parameter, meaning you are free to save whatever you wish.
         :param iteration: Iteration to save this image to. Used for displaying the data.
-                    If None, :code:`iteration = len(self.data.index)`
+                    If None, the iteration after the highest one logged so far is used.
         """
         self.__insert_text(name, value, iteration)
-        self.save()
 
     def add_image(self, name, value, iteration=None):
         """
@@ -194,35 +492,42 @@ class TrainingLogger:
         If the given image name does not exist yet, a new
         column is added to the dataframe and metadata.
 
-        The method saves the data to file after adding.
+        The image is encoded and written to disk in a background thread, call
+        :meth:`flush` to wait for all pending images to be written.
+        The path of the image is stored in :attr:`images`, rather than in the dataframe.
+        The data is written to file by the next periodic save.
 
         :param name: Name of the value, used to group and display the data.
         :param value: Image to be added. This should be in the form of a :class:`numpy.ndarray` or similar. Type can be either :obj:`numpy.float32` (with values in the range :math:`[0, 1)` ) or :obj:`numpy.uint8` (with values in the range :math:`[0,256]` ).
-        :param iteration: Iteration to save this image to. Used for displaying the data. If :code:`None`, :code:`iteration = len(self.data.index)`
+        :param iteration: Iteration to save this image to. Used for displaying the data. If :code:`None`, the iteration after the highest one logged so far is used.
         """
         name = self._get_name(name)
-        if name not in self.data.columns:
-            self.data[name] = None
-            self.metadata[name] = "img"
-            self.meta_changed = True
-
-        if iteration is None:
-            iteration = len(self.data.index)
-        assert (
-            self.metadata[name] == "img"
-        ), f"Wrong datatype 'img' for column of type '{self.metadata[name]}''"
-
         if value.dtype == np.float32:
-            value = (value * 255).astype("uint8")
+            # Scale directly into the uint8 buffer, without a full float32 temporary
+            img = np.empty(value.shape, np.uint8)
+            np.multiply(value, 255, out=img, casting="unsafe")
+            value = img
+        else:
+            value = value.copy()
+
+        with self._lock:
+            # The column is only registered once the image is queued, so a failure leaves no empty column
+            self.__check_datatype((name,), "img")
+            iteration = self._resolve_iteration(iteration)
 
         img_path = os.path.join(self.basename, f"{name}-{iteration}.png")
-        os.makedirs(os.path.dirname(img_path), exist_ok=True)
-        i = Image.fromarray(value)
-        i.save(img_path)
-        i.close()
-
-        self.data.loc[iteration, name] = img_path
-        self.save()
+        img_dir = os.path.dirname(img_path)
+        if img_dir not in self._known_dirs:
+            os.makedirs(img_dir, exist_ok=True)
+            self._known_dirs.add(img_dir)
+        future = self._img_pool.submit(
+            _encode_and_save, value, img_path, self.compress_level
+        )
+        self._img_futures.append(future)
+
+        with self._lock:
+            self.__register((name,), "img")
+            self._append_image(name, iteration, img_path, future)
 
     def add_scalars(self, pre: str = "", post: str = "", iteration=None, **keyvals):
         """
@@ -231,25 +536,19 @@ class TrainingLogger:
         If a given scalar name does not exist yet, a new
         column is added to the dataframe and metadata.
 
-        The method saves the data to file after adding.
+        The data is written to file by the next periodic save.
 
         :param keyvals: Name and values to add. Note that the values should be numbers, not Tensors or Arrays,
                     for them to work properly with the visualization. However, no check is made against
                     this, meaning you are free to save whatever you wish.
         :param pre: String to add before every name
         :param post: String to add after every name
-        :param iteration: Iteration to save this image to. Used for displaying the data. If None, :code:`iteration = len(self.data.index)`
+        :param iteration: Iteration to save this image to. Used for displaying the data. If None, the iteration after the highest one logged so far is used.
         """
-        old_pre, old_post = self.prefix, self.postfix
-
-        self.prefix = self.prefix + pre
-        self.postfix = self.postfix + post
-
-        if iteration is None:
-            iteration = len(self.data.index)
-
-        for name, val in keyvals.items():
-            self.__insert_scalar(name, val, iteration)
-        self.save()
-
-        self.prefix, self.postfix = old_pre, old_post
\ No newline at end of file
+        pre, post = self.prefix + pre, self.postfix + post
+        row = {pre + name + post: val for name, val in keyvals.items()}
+        if row:
+            with self._lock:
+                self.__register(row, "scalar")
+                row["__iter__"] = self._resolve_iteration(iteration)
+                self._append_row(row)
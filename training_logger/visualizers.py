@@ -1,15 +1,190 @@
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+import os
 import re
-from collections import Iterable
+import functools
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Iterable
 from training_logger import TrainingLogger
 from PIL import Image
 
+@functools.lru_cache(maxsize=None)
+def _optional_import(module, name):
+    """
+    Import an attribute from an optional dependency. This is done on first use rather than at
+    module level, so importing the package for logging does not pay for the plotting dependencies.
+
+    :returns: The attribute, or None if the module is not installed.
+    """
+    try:
+        return getattr(importlib.import_module(module), name)
+    except ImportError:
+        return None
+
+
+def _gauss_smooth_loop(y, window):
+    # Explicit loop with clamped indices, which is equivalent to edge padding followed by a
+    # valid convolution, and is vectorized by LLVM when compiled with numba.
+    n = y.shape[0]
+    half = window.shape[0] // 2
+    out = np.empty(n, dtype=np.float64)
+    for i in range(n):
+        acc = 0.0
+        for j in range(-half, half + 1):
+            k = min(max(i + j, 0), n - 1)
+            acc += y[k] * window[j + half]
+        out[i] = acc
+    return out
+
+
+@functools.lru_cache(maxsize=None)
+def _gauss_smooth_1d():
+    """
+    :returns: :func:`_gauss_smooth_loop` compiled with numba, or None if numba is not installed.
+    """
+    njit = _optional_import('numba', 'njit')
+    if njit is None:
+        return None
+    return njit(fastmath=True, cache=True)(_gauss_smooth_loop)
+
+def _maybe_float32(values, rtol=1e-6):
+    """
+    Convert a double precision series to float32 if this does not visibly change the plot.
+
+    The rounding error is compared to the range of the series rather than to the values
+    themselves, so counters or timestamps with a large offset keep double precision.
+
+    :param values: The series in double precision.
+    :param rtol: The largest allowed rounding error, relative to the range of the series.
+    :returns: The float32 series, or :code:`values` unchanged.
+    """
+    if len(values) == 0:
+        return values.astype(np.float32)
+    with np.errstate(invalid='ignore', over='ignore'):
+        single = values.astype(np.float32)
+        if not np.isfinite(single).all():
+            return values
+        error = np.max(np.abs(single - values))
+        if error <= rtol * (np.max(values) - np.min(values)):
+            return single
+    return values
+
+
+def _lttb_indices(x, y, n_out):
+    """
+    Select :code:`n_out` points of a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    Uses :mod:`tsdownsample` if it is installed, and a NumPy implementation otherwise.
+
+    :returns: Sorted indices of the selected points, always including the first and last point.
+    """
+    n = x.shape[0]
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    LTTBDownsampler = _optional_import('tsdownsample', 'LTTBDownsampler')
+    if LTTBDownsampler is not None:
+        return LTTBDownsampler().downsample(x, y, n_out=n_out)
+
+    x = x.astype(np.float64, copy=False)
+    y = y.astype(np.float64, copy=False)
+    # Edges of the n_out - 2 buckets between the first and last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i < n_out - 3 else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+#: PIL modes with 8 bits per channel, which are decoded straight into an uint8 array
+_UINT8_MODES = frozenset({'L', 'LA', 'P', 'RGB', 'RGBA', 'CMYK', 'YCbCr'})
+
+
+@functools.lru_cache(maxsize=64)
+def _load_image_array(path, mtime, max_pixels=None):
+    # mtime is part of the cache key, so images that are rewritten are decoded again
+    with Image.open(path) as i:
+        if max_pixels and i.format == 'JPEG' and i.width * i.height > max_pixels:
+            # Let libjpeg decode at a reduced scale, which is much cheaper than decoding the full image
+            scale = np.sqrt(max_pixels / (i.width * i.height))
+            i.draft(i.mode, (int(i.width * scale), int(i.height * scale)))
+        # np.array copies once into an array we own, np.asarray may give a read-only view that needs another copy
+        a = np.array(i, dtype=np.uint8) if i.mode in _UINT8_MODES else np.array(i)
+    a.setflags(write=False)
+    return a
+
+
+def _plot_batch(series, axes=None, **kwargs):
+    """
+    Plot several series on the same axes as a single :class:`~matplotlib.collections.LineCollection`.
+
+    An empty line is added for each series, which takes the next color of the axes and
+    provides the legend entry for the series. If kwargs contain properties that only lines
+    have, such as :code:`marker`, each series is plotted as its own line instead.
+
+    :param series: List of :code:`(x, y, label)` tuples.
+    :param axes: The axes to plot on. If None, a new figure is created and it's axes used.
+    :param kwargs: Keyword-arguments passed to the :class:`~matplotlib.collections.LineCollection`,
+                or to :meth:`Axes.plot()<matplotlib.axes.Axes.plot>` for line-only properties.
+    :returns: :class:`~matplotlib.axes.Axes` object, the one used to draw the plot.
+    """
+    if axes is None:
+        axes = plt.figure().gca()
+    collection_kwargs = {k: v for k, v in kwargs.items() if k not in ('color', 'c')}
+    if not all(hasattr(LineCollection, 'set_' + k) for k in collection_kwargs):
+        for x, y, label in series:
+            axes.plot(x, y, label=label, **kwargs)
+        return axes
+
+    segments, colors = [], []
+    for x, y, label in series:
+        proxy, = axes.plot([], [], label=label, **kwargs)
+        colors.append(proxy.get_color())
+        segments.append(np.column_stack([x, y]))
+    if segments:
+        axes.add_collection(LineCollection(segments, colors=colors, label='_nolegend_', **collection_kwargs))
+        axes.autoscale_view()
+    return axes
+
+
+def _finalize_axes(axes):
+    """
+    Add a legend to the axes if any of the series plotted on it asked for one.
+
+    Plot methods only record that a legend is wanted, so that it is built once per axes
+    instead of once per plotted series.
+
+    :returns: The same :class:`~matplotlib.axes.Axes` object.
+    """
+    if axes is not None and getattr(axes, '_tl_needs_legend', False):
+        axes.legend()
+        axes._tl_needs_legend = False
+    return axes
+
+
 class LogVisualizer:
     """
     Class to display training progress of a single run
     """
+
+    #: Window size from which smoothing uses FFT convolution, when SciPy is available
+    FFT_MIN_WINDOW = 64
+    #: Window size times series length from which smoothing uses FFT convolution, when SciPy is available
+    FFT_MIN_WORK = 2_000_000
+    #: Number of points from which plotted lines are rasterized, unless :code:`rasterized` is given explicitly
+    RASTERIZE_THRESHOLD = 5000
+    #: Number of pixels from which JPEG images are decoded at a reduced scale by :meth:`show_img`. None disables this.
+    DRAFT_MAX_PIXELS = 2_000_000
     
     def __init__(self, path, prefix=''):
         """
@@ -18,8 +193,11 @@ class LogVisualizer:
         :param path: The path of the directory containing the run log and metadata
         :param prefix: Prefix to add to labels when plotting. This is useful when plotting data from more than one source on the same axes object
         """
-        self.logger = TrainingLogger(path, True)
+        self.logger = TrainingLogger(path, True, parquet_cache=True)
         self.prefix = prefix
+        self._scalar_cols = self._find_scalar_cols()
+        self._smooth_cache = {}
+        self._series_cache = {}
     
     def update_data(self):
         """
@@ -29,24 +207,59 @@ class LogVisualizer:
         only updates the internal state of the visualizer.
         """
         try:
-            self.logger = TrainingLogger(self.logger.basename, overwrite=True)
+            self.logger = TrainingLogger(self.logger.basename, overwrite=True, parquet_cache=True)
+            self._scalar_cols = self._find_scalar_cols()
+            self._smooth_cache = {}
+            self._series_cache = {}
         except Exception as e:
             print("Could not update...")
             print(str(e))
+
+    def _find_scalar_cols(self):
+        return [k for k, v in self.logger.metadata.items() if v == 'scalar']
         
-    def smooth_data(self, data, window_size, sigma):
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def _gaussian_window(window_size, sigma):
         window = np.arange(-(window_size // 2), window_size // 2 + 1)
-        window = 1 / (sigma * np.sqrt(2 * np.pi)) * np.exp(- 1 / 2 * (window / sigma) ** 2)
+        window = np.exp(- 1 / 2 * (window / sigma) ** 2)
         window /= np.sum(window)
+        window.setflags(write=False)
+        return window
+
+    def smooth_data(self, data, window_size, sigma):
+        return self._smooth_cached(data, window_size, sigma).copy()
+
+    def _smooth_cached(self, data, window_size, sigma):
+        # Returns a shared read-only array, so it is only used internally for plotting
+        key = (window_size, sigma, data.dtype.str, data.shape, hash(data.tobytes()))
+        smoothed = self._smooth_cache.get(key)
+        if smoothed is None:
+            smoothed = self._smooth_cache[key] = self._smooth(data, window_size, sigma)
+            smoothed.setflags(write=False)
+        return smoothed
 
-        to_conv = np.zeros((data.shape[0] + window_size - 1))
-        to_conv[window_size // 2:-(window_size // 2)] = data
-        to_conv[:window_size // 2] = data[0]
-        to_conv[-window_size // 2:] = data[-1]
+    def _smooth(self, data, window_size, sigma):
+        window = self._gaussian_window(window_size, sigma)
 
+        dtype = np.float32 if data.dtype == np.float32 else np.float64
+        data = data.astype(dtype, copy=False)
+        use_fft = window.shape[0] >= self.FFT_MIN_WINDOW or window.shape[0] * data.shape[0] > self.FFT_MIN_WORK
+        oaconvolve = _optional_import('scipy.signal', 'oaconvolve') if use_fft else None
+        if oaconvolve is None:
+            gauss_smooth_1d = _gauss_smooth_1d()
+            if gauss_smooth_1d is not None:
+                return gauss_smooth_1d(data, window)
+
+        # The window always has an odd length, so both ends are padded equally
+        half = window.shape[0] // 2
+        to_conv = np.pad(data, half, mode='edge')
+
+        if oaconvolve is not None:
+            return oaconvolve(to_conv, window.astype(dtype, copy=False), mode='valid')
         return np.convolve(to_conv, window, mode='valid')
     
-    def show_graph(self, name, axes=None, ylim=None, xlim=None, smooth_window=0, smooth_sigma=3, legend=True, **kwargs):
+    def show_graph(self, name, axes=None, ylim=None, xlim=None, smooth_window=0, smooth_sigma=3, legend=True, downsample=None, **kwargs):
         """
         Base method to plot a scalar value.
         
@@ -57,33 +270,69 @@ class LogVisualizer:
         :param smooth_window: Window to average for smoothing the plot. If 0, no smoothing is performed, otherwise
                     the data is smoothed as :math:`\\hat{x}[i] = \\frac{\\sum_{j = -\\left\\lfloor s/2 \\right\\rfloor}^{\\left\\lfloor s/2 \\right\\rfloor} x[i + j]}{s}`, where :math:`s`
                     is the smoothing window.
+        :param legend: If True, a legend is added to the axes.
+        :param downsample: If given, series with more points are reduced to this many points with the
+                    Largest-Triangle-Three-Buckets algorithm before plotting. Smoothing is done on the full series first.
         :param kwargs: Keyword-arguments passed to :meth:`Axes.plot()<matplotlib.axes.Axes.plot>`. Should not contain label.
+                    If :code:`rasterized` is not given, series longer than :attr:`RASTERIZE_THRESHOLD` are rasterized.
         :returns: :class:`~matplotlib.axes.Axes` object, the one used to draw the plot.
         :raises: :exc:`AssertionError` if name is not a scalar column
         """
-        assert name in self.logger.data.columns
-        assert self.logger.metadata[name] == 'scalar'
-        plt_data = self.logger.data[name].dropna()
+        axes = self._draw_graph(name, axes, ylim, xlim, smooth_window, smooth_sigma, legend, downsample, **kwargs)
+        return _finalize_axes(axes)
 
-        x = plt_data.index.values
-        y = plt_data.values
-
-        if smooth_window > 0:
-            y = self.smooth_data(y, smooth_window, smooth_sigma)
+    def _draw_graph(self, name, axes=None, ylim=None, xlim=None, smooth_window=0, smooth_sigma=3, legend=True, downsample=None, **kwargs):
+        # Same as show_graph, but only records that a legend is wanted. Callers plotting
+        # several series on one axes call _finalize_axes once they are done.
+        x, y = self._prepare_series(name, smooth_window, smooth_sigma, downsample)
 
         if axes is None:
             axes = plt.figure().gca()
+        kwargs.setdefault('rasterized', len(y) > self.RASTERIZE_THRESHOLD)
         axes.plot(x, y, label=self.prefix + name, **kwargs)
         if legend:
-            axes.legend()
+            axes._tl_needs_legend = True
+        self._set_limits(axes, ylim, xlim)
+        return axes
+
+    def _prepare_series(self, name, smooth_window=0, smooth_sigma=3, downsample=None):
+        assert name in self.logger.data.columns
+        assert self.logger.metadata[name] == 'scalar'
+        x, y = self._get_xy(name)
+
+        if smooth_window > 0:
+            y = self._smooth_cached(y, smooth_window, smooth_sigma)
+
+        if downsample and len(y) > downsample:
+            idx = _lttb_indices(x, y, downsample)
+            x, y = x[idx], y[idx]
+        return x, y
+
+    def _set_limits(self, axes, ylim=None, xlim=None):
         if ylim is not None:
             axes.set_ylim(ylim)
-        if xlim is not None and isinstance(xlim, Iterable):
+        if xlim is not None and isinstance(xlim, Iterable) and not isinstance(xlim, str):
             axes.set_xlim(xlim)
         elif xlim is not None:
             axes.set_xlim((xlim, self.logger.data.index.max()))
-        return axes
     
+    def _get_xy(self, name):
+        xy = self._series_cache.get(name)
+        if xy is None:
+            plt_data = self.logger.data[name].dropna()
+            values = plt_data.values
+            if values.dtype == np.float64:
+                # Single precision halves the memory traffic, but only if the rounding is invisible
+                values = _maybe_float32(values)
+            index = plt_data.index.values
+            if index.dtype.kind in 'iu':
+                # Dense integer iterations, narrowed to int32 when they fit to halve the x-axis memory
+                index = plt_data.index.to_numpy(dtype=np.int64, copy=False)
+                if len(index) and index.min() >= np.iinfo(np.int32).min and index.max() <= np.iinfo(np.int32).max:
+                    index = index.astype(np.int32)
+            xy = self._series_cache[name] = (index, values)
+        return xy
+
     def show_img(self, name, iteration, axes=None):
         """
         Base method to show an image from the training log.
@@ -95,7 +344,7 @@ class LogVisualizer:
         :raises: :exc:`AssertionError` if name is not an image column
         :raises: :exc:`FileNotFoundError` if the image has been moved or removed from the training directory
         """
-        assert name in self.logger.data.columns
+        assert name in self.logger.metadata
         assert self.logger.metadata[name] == 'img'
 
         if axes is None:
@@ -103,14 +352,12 @@ class LogVisualizer:
             
             axes = fig.gca()
         
-        path = self.logger.data.loc[iteration, name]
+        path = self.logger.images[name][iteration]
         assert path is not None
-        i = Image.open(path)
-        a = np.asarray(i)
+        a = _load_image_array(path, os.path.getmtime(path), self.DRAFT_MAX_PIXELS)
 
-        axes.imshow(a)
+        axes.imshow(a, interpolation='nearest')
         axes.set_title(self.prefix + name)
-        i.close()
         return axes
     
     def show_matching_scalars(self, expr, axes=None, **kwargs):
@@ -125,16 +372,18 @@ class LogVisualizer:
         are plotted in the same axes.
         
         :param expr: String or list of strings, the expression(s) to match agains. Should follow standard Python :mod:`re` syntax.
+                    Compiled patterns are also accepted.
         :param axes: The axes to plot. If not None, all values are plotted in this one. Otherwise, see the description above.
         :param kwargs: Keyword-arguments passed to :func: :meth:`~LogVisualizer.show_scalars`.
         :returns: :class:`~matplotlib.axes.Axes` object, the one used to draw the plot.
         """
-        if not isinstance(expr, Iterable):
+        if isinstance(expr, str) or not isinstance(expr, Iterable):
             expr = [expr]
+        patterns = [re.compile(ex) for ex in expr]
         names = []
-        for ex in expr:
+        for pattern in patterns:
             for col_name in self.get_cols():
-                if re.fullmatch(ex, col_name):
+                if pattern.fullmatch(col_name):
                     names.append(col_name)
         axes = self.show_scalars(names, False, axes, **kwargs)
         return axes
@@ -143,22 +392,32 @@ class LogVisualizer:
         """
         Method to show multiple scalars.
         
-        This method simply calls :meth:`~LogVisualizer.show_graph` for all names,
-        as well as some handling of the axes objects.
+        If subplots is true, this method simply calls :meth:`~LogVisualizer.show_graph` for all names.
+        Otherwise, all columns are drawn as a single :class:`~matplotlib.collections.LineCollection`.
         
         :param names: Iterable of column names. Each must be a scalar column.
         :param subplots: If true, each column is plotted on its own axis. Otherwise, they are plotted on the same.
         :param axes: The :class:`~matplotlib.axes.Axes` object used to plot the (first) data series
-        :param kwargs: Keyword-arguments passed to :meth:`~LogVisualizer.show_graph`
+        :param kwargs: Keyword-arguments passed to :meth:`~LogVisualizer.show_graph`. If subplots is false,
+                    arguments that :meth:`~LogVisualizer.show_graph` does not take itself are passed to the
+                    :class:`~matplotlib.collections.LineCollection` instead of :meth:`Axes.plot()<matplotlib.axes.Axes.plot>`.
         :returns: :class:`~matplotlib.axes.Axes` object, the one used to draw the plot.
         """
-        for name in names:
-            axes = self.show_graph(name, axes, legend=subplots, **kwargs)
-            if subplots:
+        if subplots:
+            for name in names:
+                axes = self.show_graph(name, axes, **kwargs)
                 axes = None
-        if not subplots:
-            axes.legend()
-        return axes
+            return axes
+
+        ylim, xlim = kwargs.pop('ylim', None), kwargs.pop('xlim', None)
+        legend = kwargs.pop('legend', True)
+        options = {k: kwargs.pop(k) for k in ('smooth_window', 'smooth_sigma', 'downsample') if k in kwargs}
+        series = [(*self._prepare_series(name, **options), self.prefix + name) for name in names]
+        kwargs.setdefault('rasterized', sum(len(y) for _, y, _ in series) > self.RASTERIZE_THRESHOLD)
+        axes = _plot_batch(series, axes, **kwargs)
+        self._set_limits(axes, ylim, xlim)
+        axes._tl_needs_legend = legend
+        return _finalize_axes(axes)
     
     def show_all_scalars(self, subplots=True, axes=None, **kwargs):
         """
@@ -169,17 +428,18 @@ class LogVisualizer:
         :param kwargs: Keyword-arguments passed to :meth:`~LogVisualizer.show_graph()`
         :returns: :class:`~matplotlib.axes.Axes` object, the one used to draw the plot.
         """
-        for k, v in self.logger.metadata.items():
-            if v == 'scalar':
-                axes = self.show_graph(k, axes, **kwargs)
-                if subplots:
-                    axes = None
+        for k in self._scalar_cols:
+            axes = self._draw_graph(k, axes, **kwargs)
+            if subplots:
+                _finalize_axes(axes)
+                axes = None
+        return _finalize_axes(axes)
     
     def get_cols(self):
         """
         :returns: A list containing all column names
         """
-        return list(self.logger.data.columns)
+        return list(self.logger.metadata)
     
     def get_non_null_index(self, col):
         """
@@ -187,6 +447,8 @@ class LogVisualizer:
         
         :returns: A list of the non-null indices for column col
         """
+        if self.logger.metadata[col] == 'img':
+            return list(self.logger.images.get(col, {}))
         return list(self.logger.data[col].dropna().index)
 
 class MultiLogVisualizer:
@@ -203,13 +465,17 @@ class MultiLogVisualizer:
         :param paths: One or more paths to log dirs
         """
         self.visualizers = [LogVisualizer(path, f"{path.rpartition('/')[-1]}/") for path in paths]
+        self._cols = None
         
     def update_data(self):
         """
         Update the data for all internal visualizers.
+
+        The logs are read in parallel threads, as reading is mostly I/O and parsing that releases the GIL.
         """
-        for viz in self.visualizers:
-            viz.update_data()
+        with ThreadPoolExecutor(max_workers=min(8, len(self.visualizers)) or 1) as ex:
+            list(ex.map(LogVisualizer.update_data, self.visualizers))
+        self._cols = None
     
     def show_graph(self, name, axes=None, ylim=None, xlim=None, **kwargs):
         """
@@ -245,25 +511,28 @@ class MultiLogVisualizer:
         Show plots of all scalar columns that matches an expression.
         
         This function can take either a single expression or multiple.
-        Dataseries from the same expression from all visualizers are plotted in the same axes object.
-        Dataseries from different expressions are plotted in different axes.
+        Each column is matched once against all expressions, and the matching dataseries
+        from all visualizers are plotted in the same axes object.
         
         :param expr: String or list of strings, the expression(s) to match agains. Should follow standard Python :mod:`re` syntax.
-        :param axes: The :class:`~matplotlib.axes.Axes` to plot the first expression in.
-        :param kwargs: Keyword-arguments passed to the show_graph method of internal visualizers.
-        :returns: :class:`~matplotlib.axes.Axes` object, the one used to draw the final dataseries.
+                    Compiled patterns are also accepted.
+        :param axes: The :class:`~matplotlib.axes.Axes` to plot in.
+        :param kwargs: Keyword-arguments passed to :meth:`~MultiLogVisualizer.show_scalars`.
+        :returns: :class:`~matplotlib.axes.Axes` object, the one used to draw the plot.
         """
-        for viz in self.visualizers:
-            axes = viz.show_matching_scalars(expr, axes, **kwargs)
-        return plt.gca()
-        
+        if isinstance(expr, str) or not isinstance(expr, Iterable):
+            expr = [expr]
+        patterns = [re.compile(ex) for ex in expr]
+        names = [col for col in self.get_cols() if any(p.fullmatch(col) for p in patterns)]
+        return self.show_scalars(names, False, axes, **kwargs)
     
     def show_scalars(self, names, subplots=True, axes=None, **kwargs):
         """
         Method to show multiple scalars.
         
-        This method simply calls :meth:`LogVisualizer.show_graph` for all combination of names and internal visualizers,
-        as well as some handling of the axes objects.
+        If subplots is true, this method simply calls :meth:`LogVisualizer.show_graph` for all combination of names and
+        internal visualizers, as well as some handling of the axes objects. Otherwise, all data series are drawn as
+        a single :class:`~matplotlib.collections.LineCollection`, see :meth:`LogVisualizer.show_scalars`.
         
         :param names: Iterable of column names. Each must be a scalar column.
         :param subplots: If true, each column is plotted on its own axis. The same column from different visualizers are plotted together. 
@@ -272,14 +541,34 @@ class MultiLogVisualizer:
         :param kwargs: Keyword-arguments passed to :meth:`LogVisualizer.show_graph`
         :returns: :class:`~matplotlib.axes.Axes` object, the one used to draw the plot.
         """
+        if not subplots:
+            ylim, xlim = kwargs.pop('ylim', None), kwargs.pop('xlim', None)
+            legend = kwargs.pop('legend', True)
+            options = {k: kwargs.pop(k) for k in ('smooth_window', 'smooth_sigma', 'downsample') if k in kwargs}
+            series = []
+            last_viz = None
+            scalar_cols = [set(viz._scalar_cols) for viz in self.visualizers]
+            for name in names:
+                for viz, cols in zip(self.visualizers, scalar_cols):
+                    if name not in cols:
+                        continue
+                    x, y = viz._prepare_series(name, **options)
+                    series.append((x, y, viz.prefix + name))
+                    last_viz = viz
+            kwargs.setdefault('rasterized', sum(len(y) for _, y, _ in series) > LogVisualizer.RASTERIZE_THRESHOLD)
+            axes = _plot_batch(series, axes, **kwargs)
+            if last_viz is not None:
+                last_viz._set_limits(axes, ylim, xlim)
+            axes._tl_needs_legend = legend
+            return _finalize_axes(axes)
+
+        scalar_cols = [set(viz._scalar_cols) for viz in self.visualizers]
         for name in names:
-            for viz in self.visualizers:
-                try:
-                    axes = viz.show_graph(name, axes, **kwargs)
-                except AssertionError:
-                    pass
-            if subplots:
-                axes = None
+            for viz, cols in zip(self.visualizers, scalar_cols):
+                if name in cols:
+                    axes = viz._draw_graph(name, axes, **kwargs)
+            _finalize_axes(axes)
+            axes = None
     
     def show_all_scalars(self, subplots=True, axes=None, **kwargs):
         """
@@ -291,18 +580,17 @@ class MultiLogVisualizer:
         :param kwargs: Keyword-arguments passed to :meth:`LogVisualizer.show_graph()`
         :returns: :class:`~matplotlib.axes.Axes` object, the one used to draw the plot.
         """
-        md = self.visualizers[0].metadata
-        for viz in self.visualizers[1:]:
-            md.update(viz.metadata)
-        for k, v in md.items():
-            if v == 'scalar':
-                for viz in self.visualizers:
-                    try:
-                        axes = viz.show_graph(k, axes, **kwargs)
-                    except AssertionError:
-                        pass
-                if subplots:
-                    axes = None
+        scalar_cols = [set(viz._scalar_cols) for viz in self.visualizers]
+        # Union of the scalar columns of all visualizers, in the order they are first seen
+        names = dict.fromkeys(k for viz in self.visualizers for k in viz._scalar_cols)
+        for k in names:
+            for viz, cols in zip(self.visualizers, scalar_cols):
+                if k in cols:
+                    axes = viz._draw_graph(k, axes, **kwargs)
+            if subplots:
+                _finalize_axes(axes)
+                axes = None
+        _finalize_axes(axes)
         return plt.gca()
     
     def show_category_scalars(self, category, *args, single_axis = True, **kwargs):
@@ -313,7 +601,10 @@ class MultiLogVisualizer:
         """
         :returns: A list containing all column names
         """
-        return list(set([c for viz in self.visualizers for c in viz.get_cols()]))
+        if self._cols is None:
+            # Ordered union, so plots and colors do not depend on string hashing
+            self._cols = list(dict.fromkeys(col for viz in self.visualizers for col in viz.get_cols()))
+        return list(self._cols)
     
     def get_non_null_index(self, col):
         """